@@ -14,23 +14,40 @@ from __future__ import annotations
 
 import argparse
 import collections
-import configparser
+import concurrent.futures
+import contextlib
 import fnmatch
+import functools
 import glob
+import itertools
 import logging
 import os
+import pickle
+import re
 import shlex
 import shutil
 import subprocess
 import sys
-from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping
-from typing import Any, NoReturn, Optional, Union
+import tempfile
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
+from typing import Any, NoReturn, Optional, TypeVar, Union
 
 __prog__ = "logfilter"
 __version__ = "0.3.0"
 
 CONFIG_PATH = "config"
 LOGFILES_CONF_PATH = "logfiles.conf"
+DEFAULTS_CACHE_PATH = "defaults.pickle"
+LOGFILES_CACHE_PATH = "logfiles.pickle"
+# Name of the section whose settings apply to every section
+DEFAULT_SECTION = "DEFAULT"
 # LOGGING_DISPLAY_NAMES
 LOG_LEVELS: list[str] = [
     "EMERG",
@@ -42,6 +59,10 @@ LOG_LEVELS: list[str] = [
     "INFO",
     "DEBUG",
 ]
+# Each level name to an AWK regex matching it or any more severe level
+LEVEL_PATTERNS: dict[str, str] = {
+    level: "|".join(LOG_LEVELS[: i + 1]) for i, level in enumerate(LOG_LEVELS)
+}
 DEFAULTS: dict[str, str] = {
     "after": "today-3days",
     "before": "today+1day",
@@ -61,9 +82,48 @@ BOOLEAN_STATES: dict[str, bool] = {
     "false": False,
     "off": False,
 }
+# Options taking a value understood by fast_parse_args, to their dest
+FAST_VALUE_OPTIONS: dict[str, str] = {
+    "-a": "after",
+    "--after": "after",
+    "-b": "before",
+    "--before": "before",
+    "-l": "level",
+    "--level": "level",
+}
+
+# AWK rules printing a header giving the name of each file, empty or not
+HEADER_RULE = r"""
+function lf_header(file) { printf "\n==> %s <==\n", file }
+FNR == 1 {
+    while (++lf_argi < ARGC && ARGV[lf_argi] != FILENAME) lf_header(ARGV[lf_argi])
+    lf_header(FILENAME)
+}
+END { while (++lf_argi < ARGC) lf_header(ARGV[lf_argi]) }
+"""
+# AWK rule adding the files named in the file *lf_filelist* to ARGV
+FILE_LIST_RULE = r"""
+BEGIN {
+    while ((getline lf_file < lf_filelist) > 0) ARGV[ARGC++] = lf_file
+    close(lf_filelist)
+}
+"""
+# Total length of file arguments above which they go in a file list instead
+MAX_FILES_LENGTH = 100_000
+# Matches a key–value pair on a line not starting with '#', see parse_kv_config
+KV_PATTERN = re.compile(
+    r"^(?![^\S\n]*#)[^\S\n]*((?:[^\s=][^=\n]*?)?)[^\S\n]*=[^\S\n]*(.*?)[^\S\n]*$",
+    re.MULTILINE,
+)
+# Matches a line starting with a section name in square brackets, like
+# configparser's SECTCRE, see parse_sections
+SECTION_PATTERN = re.compile(r"^[^\S\n]*\[(.+)\].*$", re.MULTILINE)
+# Matches any line starting with '[', see parse_sections
+BRACKET_LINE_PATTERN = re.compile(r"^[^\S\n]*\[.*$", re.MULTILINE)
 
 # Argument type for cmds of subprocess.run
 Arg = Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]
+T = TypeVar("T")
 
 
 def disambiguate(
@@ -71,13 +131,20 @@ def disambiguate(
 ) -> Callable[[str], str]:
     """Return a function that can disambiguate a string between *names*.
 
+    *names* is consumed immediately, indexing each name by its prefixes.
+
     >>> disambiguate(LOG_LEVELS, str.upper)("warn")
     'WARNING'
     """
+    by_prefix: dict[str, list[str]] = {}
+    for name in names:
+        key = func(name)
+        for i in range(len(key) + 1):
+            by_prefix.setdefault(key[:i], []).append(name)
 
     def type_checker(value: str) -> str:
         value = func(value)
-        candidates = [name for name in names if func(name).startswith(value)]
+        candidates = by_prefix.get(value, [])
         if len(candidates) != 1:
             return value
         return candidates[0]
@@ -88,11 +155,40 @@ def disambiguate(
 def expand_paths(paths: str) -> Iterator[str]:
     """
     Split *paths* like a shell, and expand environment variables and globs.
+
+    Each matching path is yielded once, and each directory is listed once.
     """
-    for word in shlex.split(paths):
+    listings: dict[str, list[str]] = {}
+    seen: set[str] = set()
+    # Without quotes or escapes, shlex.split just splits on its whitespace
+    if any(char in paths for char in "\"'\\"):
+        words = shlex.split(paths)
+    else:
+        words = re.findall(r"[^ \t\r\n]+", paths)
+    for word in words:
         word = os.path.expanduser(word)
         word = os.path.expandvars(word)
-        yield from glob.iglob(word)
+        for path in _iglob(word, listings):
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def _iglob(pattern: str, listings: dict[str, list[str]]) -> Iterable[str]:
+    # Like glob.iglob, but reuse directory listings cached in *listings*
+    dirname, basename = os.path.split(pattern)
+    if glob.has_magic(dirname) or not glob.has_magic(basename):
+        return glob.iglob(pattern)
+    if dirname not in listings:
+        try:
+            with os.scandir(dirname or os.curdir) as entries:
+                listings[dirname] = [entry.name for entry in entries]
+        except OSError:
+            listings[dirname] = []
+    names = listings[dirname]
+    if not basename.startswith("."):
+        names = [name for name in names if not name.startswith(".")]
+    return (os.path.join(dirname, name) for name in fnmatch.filter(names, basename))
 
 
 def convert_boolean(value: str) -> bool:
@@ -100,7 +196,11 @@ def convert_boolean(value: str) -> bool:
 
 
 def build_cla_parser(defaults: Mapping[str, str]) -> argparse.ArgumentParser:
-    """Build and return command-line argument parser."""
+    """Build and return command-line argument parser.
+
+    If no FILE is given, logfiles is an empty list, and it's up to the
+    caller to expand the default logfiles.
+    """
     parser = argparse.ArgumentParser(
         prog=__prog__, description="Filter some logs based on date and log level."
     )
@@ -108,7 +208,7 @@ def build_cla_parser(defaults: Mapping[str, str]) -> argparse.ArgumentParser:
     parser.add_argument(
         "logfiles",
         nargs="*",
-        default=list(expand_paths(logfiles)),
+        default=[],
         metavar="FILE",
         help=f"filter %(metavar)s(s) or default logfiles: {logfiles}",
     )
@@ -141,59 +241,190 @@ def build_cla_parser(defaults: Mapping[str, str]) -> argparse.ArgumentParser:
     return parser
 
 
+def fast_parse_args(
+    argv: Sequence[str], defaults: Mapping[str, str]
+) -> Optional[argparse.Namespace]:
+    """Parse *argv* like the parser from build_cla_parser(*defaults*) would.
+
+    Only plain uses of the options are handled. Return None if the full
+    parser is needed instead, e.g. for help, abbreviations or errors.
+    """
+    values: dict[str, Any] = dict.fromkeys(("after", "before", "level"))
+    values["batch"] = convert_boolean(defaults["batch"])
+    logfiles: list[str] = []
+    positionals_done = False
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        if arg == "--":
+            if logfiles:
+                return None
+            logfiles = list(argv[i:])
+            break
+        if not arg.startswith("-"):
+            if positionals_done:
+                return None
+            logfiles.append(arg)
+            continue
+        positionals_done = bool(logfiles)
+        if arg in ("--batch", "--no-batch"):
+            values["batch"] = arg == "--batch"
+            continue
+        parsed = _fast_parse_option(arg, argv[i] if i < len(argv) else None)
+        if parsed is None:
+            return None
+        dest, value, used_next = parsed
+        values[dest] = value
+        i += used_next
+    return argparse.Namespace(logfiles=logfiles, **values)
+
+
+def _fast_parse_option(
+    arg: str, next_arg: Optional[str]
+) -> Optional[tuple[str, str, bool]]:
+    # Return the dest and value of option *arg*, and whether *next_arg* was
+    # used as the value, or None if fast_parse_args can't handle the option
+    used_next = False
+    if arg.startswith("--") and "=" in arg:
+        arg, value = arg.split("=", 1)
+    elif arg in FAST_VALUE_OPTIONS:
+        if next_arg is None or next_arg.startswith("-"):
+            return None
+        value, used_next = next_arg, True
+    elif "=" not in arg:
+        arg, value = arg[:2], arg[2:]
+    if arg not in FAST_VALUE_OPTIONS:
+        return None
+    dest = FAST_VALUE_OPTIONS[arg]
+    if dest == "level":
+        # argparse checks every value given, not just the last
+        value = disambiguate(LOG_LEVELS, str.upper)(value)
+        if value not in LOG_LEVELS:
+            return None
+    return dest, value, used_next
+
+
 def main() -> None:
     """Parsing arguments from sys.argv, print results to sys.stdout."""
     if os.environ.get("LF_DEBUG"):
         logging.basicConfig(level=logging.DEBUG)
     general_defaults = load_defaults(DEFAULTS)
-    cfg = configparser.ConfigParser(defaults=general_defaults, interpolation=None)
-    try:
-        read_configuration(cfg, LOGFILES_CONF_PATH)
-    except configparser.Error as err:
-        die(f"Error with configuration file: {err}")
-    cfg_defaults = cfg.defaults()
-    args = build_cla_parser(cfg_defaults).parse_args()
+    config = read_configuration(LOGFILES_CONF_PATH)
+    cfg_defaults = collections.ChainMap(
+        config.pop(DEFAULT_SECTION, {}), general_defaults
+    )
+    sections = {name: cfg_defaults.new_child(config[name]) for name in config}
+    sections[DEFAULT_SECTION] = cfg_defaults
+    args = fast_parse_args(sys.argv[1:], cfg_defaults)
+    if args is None:
+        args = build_cla_parser(cfg_defaults).parse_args()
+    if not args.logfiles:
+        # Only glob the default logfiles when they are actually used
+        args.logfiles = list(expand_paths(cfg_defaults["logfiles"]))
     logging.debug(args)
     logfiles = args.logfiles
     if not logfiles:
         logging.debug("null glob")
         return
 
-    for logfile in logfiles:
-        section = match_section(logfile, cfg) or cfg_defaults
-        try:
-            awk_variables = _set_awk_variables(args, section)
-            awk_options = _set_awk_options(section)
-        except configparser.Error as err:
-            die(f"Error with configuration file: {err}")
+    groups = list(group_by_section(logfiles, config))
+    dates = _convert_dates(args, [sections[name] for name, _ in groups])
+    with contextlib.ExitStack() as stack:
+        jobs = []
+        awk_arguments = _set_awk_arguments(
+            args, {name: sections[name] for name, _ in groups}, dates, stack
+        )
+        for section_name, files in groups:
+            awk_variables, awk_options = awk_arguments[section_name]
+            if sum(len(file) + 1 for file in files) > MAX_FILES_LENGTH and not any(
+                "\n" in file for file in files
+            ):
+                files, awk_variables, awk_options = _use_file_list(
+                    files, awk_variables, awk_options, stack
+                )
+            jobs.append(awk_command(files, **awk_options, variables=awk_variables))
+        run_jobs(jobs)
+
+
+def run_jobs(jobs: Sequence[Sequence[Arg]]) -> None:
+    """Run each command in *jobs*, writing its output to sys.stdout.
+
+    Jobs run concurrently, but output is written in the order of *jobs*.
+    """
+    if len(jobs) == 1:
+        _run(jobs[0])
+        return
+    max_workers = min(len(jobs), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        procs = executor.map(lambda cmds: _run(cmds, check=False, capture=True), jobs)
+        for proc in procs:
+            sys.stdout.buffer.write(proc.stdout)
+            sys.stdout.buffer.flush()
+            try:
+                proc.check_returncode()
+            except subprocess.CalledProcessError as err:
+                die(str(err))
+
+
+def _convert_dates(
+    args: argparse.Namespace, sections: Iterable[Mapping[str, str]]
+) -> dict[tuple[str, str], str]:
+    """Return a dict of (date, datefmt) to datestamp for every section.
+
+    Each distinct datefmt costs a single call to `date`.
+    """
+    dates_by_fmt: dict[str, dict[str, None]] = collections.defaultdict(dict)
+    for section in sections:
+        for key in ("after", "before"):
+            date = getattr(args, key) or section[key]
+            dates_by_fmt[section["datefmt"]][date] = None
+    converted = {}
+    for datefmt, unique_dates in dates_by_fmt.items():
+        dates = list(unique_dates)
+        for date, result in zip(dates, datestr_batch(dates, datefmt)):
+            converted[date, datefmt] = result
+    return converted
+
+
+def _set_awk_arguments(
+    args: argparse.Namespace,
+    sections: Mapping[str, Mapping[str, str]],
+    dates: Mapping[tuple[str, str], str],
+    stack: contextlib.ExitStack,
+) -> dict[str, tuple[dict[str, str], dict[str, Any]]]:
+    # Return a dict of section names to awk variables and options. A section
+    # can match more than one group, so each is derived once only here.
+    awk_arguments = {}
+    for section_name, section in sections.items():
+        awk_variables = _set_awk_variables(args, section_name, section, dates)
+        awk_options = _set_awk_options(section)
         if not args.batch:
-            print()
-            print("==>", logfile, "<==")
-            # Flush headers before awk starts writing
-            sys.stdout.flush()
-        awk(files=[logfile], **awk_options, variables=awk_variables)
+            _prepend_program(awk_options, HEADER_RULE, stack)
+        awk_arguments[section_name] = awk_variables, awk_options
+    return awk_arguments
 
 
 def _set_awk_variables(
-    args: argparse.Namespace, section: Mapping[str, str]
+    args: argparse.Namespace,
+    section_name: str,
+    section: Mapping[str, str],
+    dates: Mapping[tuple[str, str], str],
 ) -> dict[str, str]:
     awk_variables = {}
     level = args.level or section["level"]
-    try:
-        awk_variables["level"] = "|".join(LOG_LEVELS[: LOG_LEVELS.index(level) + 1])
-    except ValueError:
-        section_name = getattr(section, "name", "DEFAULT")
+    if (level_pattern := LEVEL_PATTERNS.get(level)) is None:
         die(f"In section [{section_name}]: invalid level name: {level}")
-    awk_variables["after"] = datestr(args.after or section["after"], section["datefmt"])
-    awk_variables["before"] = datestr(
-        args.before or section["before"], section["datefmt"]
-    )
+    awk_variables["level"] = level_pattern
+    datefmt = section["datefmt"]
+    awk_variables["after"] = dates[args.after or section["after"], datefmt]
+    awk_variables["before"] = dates[args.before or section["before"], datefmt]
     return awk_variables
 
 
-def _set_awk_options(section: Mapping[str, str]) -> dict[str, str]:
+def _set_awk_options(section: Mapping[str, str]) -> dict[str, Any]:
     if progfile := section.get("progfile"):
-        return {"progfiles": progfile}
+        return {"progfiles": [progfile]}
     return {"program_text": section["program"]}
 
 
@@ -208,31 +439,95 @@ def awk(
 ) -> int:
     """Call `awk` with the given arguments, returning its exit status.
 
+    See awk_command() for the meaning of the arguments.
+    """
+    cmds = awk_command(files, program_text, progfiles, variables, field_sep, executable)
+    return _run(cmds).returncode
+
+
+def _prepend_program(
+    awk_options: dict[str, Any], text: str, stack: contextlib.ExitStack
+) -> None:
+    # Put AWK program *text* in front of the program given by *awk_options*.
+    # Program text can't be mixed with program files, so for the latter write
+    # *text* to a temporary file that lasts as long as *stack*.
+    if "program_text" in awk_options:
+        awk_options["program_text"] = text + awk_options["program_text"]
+        return
+    # pylint: disable-next=consider-using-with
+    file = stack.enter_context(tempfile.NamedTemporaryFile("w", suffix=".awk"))
+    file.write(text)
+    file.flush()
+    awk_options["progfiles"] = [file.name, *awk_options["progfiles"]]
+
+
+def _use_file_list(
+    files: Iterable[str],
+    awk_variables: Mapping[str, str],
+    awk_options: Mapping[str, Any],
+    stack: contextlib.ExitStack,
+) -> tuple[list[str], dict[str, str], dict[str, Any]]:
+    # Return new awk arguments reading *files* from a temporary file list that
+    # lasts as long as *stack*, to keep a long command line under ARG_MAX
+    file_list = stack.enter_context(
+        tempfile.NamedTemporaryFile(  # pylint: disable=consider-using-with
+            "w",
+            encoding=sys.getfilesystemencoding(),
+            errors="surrogateescape",
+            suffix=".txt",
+        )
+    )
+    file_list.writelines(f"{file}\n" for file in files)
+    file_list.flush()
+    new_options = dict(awk_options)
+    _prepend_program(new_options, FILE_LIST_RULE, stack)
+    return [], {**awk_variables, "lf_filelist": file_list.name}, new_options
+
+
+# pylint: disable=too-many-arguments
+def awk_command(
+    files: Iterable[Arg],
+    program_text: Optional[Arg] = None,
+    progfiles: Optional[Iterable[Arg]] = None,
+    variables: Optional[Mapping[Any, Any]] = None,
+    field_sep: Optional[Arg] = None,
+    executable: Union[str, os.PathLike[str]] = "awk",
+) -> list[Arg]:
+    """Return the command line calling `awk` with the given arguments.
+
     ::
         awk [-v variables...] [-F field_sep] [-f progfiles... | program_text]
             [files...]
     """
-    executable = shutil.which(os.environ.get("LF_AWK", executable)) or die(
-        f"{executable}: command not found"
-    )
-    cmds: list[Arg] = [executable]
-    if variables is not None:
-        for var, value in variables.items():
-            cmds += ["-v", f"{var}={value}"]
-    if field_sep is not None:
-        cmds += ["-F", field_sep]
+    executable = _which(os.environ.get("LF_AWK", os.fspath(executable)))
+    cmds: list[Arg] = [
+        executable,
+        *_awk_variable_args(variables or {}),
+        *(["-F", field_sep] if field_sep is not None else []),
+        *_awk_program_args(program_text, progfiles),
+        *files,
+    ]
+    logging.debug(cmds)
+    return cmds
+
+
+def _awk_variable_args(variables: Mapping[Any, Any]) -> Iterator[str]:
+    for var, value in variables.items():
+        yield "-v"
+        yield f"{var}={value}"
+
+
+def _awk_program_args(
+    program_text: Optional[Arg], progfiles: Optional[Iterable[Arg]]
+) -> Iterator[Arg]:
     if program_text is not None:
-        cmds += ["--", program_text, *files]
+        yield "--"
+        yield program_text
     elif progfiles is not None:
         for program_file in progfiles:
-            cmds += ["-f", program_file]
-        cmds += ["--", *files]
-    logging.debug(cmds)
-    try:
-        proc = subprocess.run(cmds, check=True)
-    except subprocess.CalledProcessError as err:
-        die(str(err))
-    return proc.returncode
+            yield "-f"
+            yield program_file
+        yield "--"
 
 
 def load_config_paths(*resource: Union[str, os.PathLike[str]]) -> Iterator[str]:
@@ -253,16 +548,85 @@ def load_config_paths(*resource: Union[str, os.PathLike[str]]) -> Iterator[str]:
     resource_path = os.path.join(*resource)
     for config_dir in xdg_config_dirs:
         path = os.path.join(config_dir, resource_path)
-        if os.path.exists(path):
+        # Dangling symlinks are weeded out when the file is opened
+        if os.path.lexists(path):
             yield path
 
 
+def load_cache_path(*resource: Union[str, os.PathLike[str]]) -> str:
+    """Return the path of *resource* in the XDG cache directory.
+
+    The path is not checked for existence.
+    """
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(xdg_cache_home, *resource)
+
+
+def _cached_load(name: str, paths: list[str], load: Callable[[list[str]], T]) -> T:
+    # Return load(paths), reusing the result pickled in the cache file *name*
+    # as long as none of *paths* have been modified since it was written
+    if not paths:
+        return load(paths)
+    try:
+        key = (
+            __version__,
+            [
+                (path, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size)
+                for path, stat in ((path, os.stat(path)) for path in paths)
+            ],
+        )
+    except OSError:
+        return load(paths)
+    cache = load_cache_path(__prog__, name)
+    # A damaged cache can fail to load in all sorts of ways (MemoryError,
+    # AttributeError, ...), none of which should stop the program
+    try:
+        with open(cache, "rb") as file:
+            cached_key, result = pickle.load(file)
+        if cached_key == key:
+            logging.debug("read cached configuration from file: %s", cache)
+            return result  # type: ignore[no-any-return]
+    except Exception as err:  # pylint: disable=broad-except
+        logging.debug("couldn't read cache file: %s: %s", err, cache)
+    result = load(paths)
+    cache_dir = os.path.dirname(cache)
+    temp_name = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as file:
+            temp_name = file.name
+            pickle.dump((key, result), file)
+        os.replace(temp_name, cache)
+    except Exception as err:  # pylint: disable=broad-except
+        logging.debug("couldn't write cache file: %s: %s", err, cache)
+        if temp_name is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_name)
+    return result
+
+
 def load_defaults(defaults: MutableMapping[str, str]) -> collections.ChainMap[str, str]:
-    """Merge *defaults* with k:v loaded from configuration files."""
-    maps = []
-    for cfg in load_config_paths(__prog__, CONFIG_PATH):
+    """Merge *defaults* with k:v loaded from configuration files.
+
+    Parsed files are cached until they are next modified.
+    """
+    paths = list(load_config_paths(__prog__, CONFIG_PATH))
+    maps = _cached_load(DEFAULTS_CACHE_PATH, paths, _load_kv_configs)
+    return collections.ChainMap(*maps, defaults)
+
+
+def _load_kv_configs(paths: Iterable[str]) -> list[dict[str, str]]:
+    return [parse_kv_config(text) for _, text in _read_config_files(paths)]
+
+
+def _read_config_files(paths: Iterable[str]) -> Iterator[tuple[str, str]]:
+    # Yield each of *paths* that can be read along with its contents
+    for cfg in paths:
         try:
-            file = open(cfg, encoding="utf-8")
+            with open(cfg, encoding="utf-8") as file:
+                text = file.read()
         except OSError:
             logging.debug("found config file but couldn't open for reading: %s", cfg)
             continue
@@ -271,37 +635,79 @@ def load_defaults(defaults: MutableMapping[str, str]) -> collections.ChainMap[st
                 "found config file but couldn't decode as UTF-8: %s: %s", err, cfg
             )
             continue
-        with file:
-            maps.append(parse_kv_config(file))
-            logging.debug("read configuration from file: %s", cfg)
-    return collections.ChainMap(*maps, defaults)
+        logging.debug("read configuration from file: %s", cfg)
+        yield cfg, text
 
 
 def read_configuration(
-    config: configparser.ConfigParser, pathname: Union[str, os.PathLike[str]]
-) -> list[str]:
-    """Load configuration files into *config*.
+    pathname: Union[str, os.PathLike[str]]
+) -> dict[str, dict[str, str]]:
+    """Return a dict of section names to sections, each a dict of keys to
+    values, loaded from configuration files named *pathname*.
 
-    Return a list of files read.
+    Sections in earlier files take precedence over later ones, key by key.
+    Parsed files are cached until they are next modified.
     """
-    cfgs = list(load_config_paths(__prog__, pathname))
-    files_read = config.read(reversed(cfgs))
-    logging.debug("read configuration from files: %s", files_read)
-    return files_read
+    paths = list(load_config_paths(__prog__, pathname))
+    return _cached_load(LOGFILES_CACHE_PATH, paths, _load_section_configs)
 
 
-def match_section(
-    name: str, config: configparser.ConfigParser
-) -> Optional[configparser.SectionProxy]:
-    """Return a section of config if its name fnmatches *name*."""
-    for section in config.sections():
-        if fnmatch.fnmatch(name, section):
-            return config[section]
-    return None
+def _load_section_configs(paths: Sequence[str]) -> dict[str, dict[str, str]]:
+    config: dict[str, dict[str, str]] = {}
+    for cfg, text in _read_config_files(reversed(paths)):
+        try:
+            parsed = parse_sections(text)
+        except ValueError as err:
+            die(f"Error with configuration file: {cfg}: {err}")
+        for name, section in parsed.items():
+            config.setdefault(name, {}).update(section)
+    return config
+
+
+def section_matcher(names: Iterable[str]) -> Callable[[str], Optional[str]]:
+    """Return a function that finds the first of the section *names* that
+    fnmatches a given name, or None if there is no such section.
+
+    The section names are compiled together into a single regex up front.
+    """
+    sections = list(names)
+    pattern = re.compile(
+        "|".join(
+            f"(?P<s{i}>{fnmatch.translate(section)})"
+            for i, section in enumerate(sections)
+        )
+    )
 
+    def match_section(name: str) -> Optional[str]:
+        match = pattern.match(name)
+        if match is None or match.lastgroup is None:
+            return None
+        return sections[int(match.lastgroup[1:])]
 
-def parse_kv_config(reader: Iterable[str]) -> dict[str, str]:
-    """Return a dict of keys to values parsed from lines of text in *reader*.
+    return match_section
+
+
+def group_by_section(
+    logfiles: Iterable[str], config: Iterable[str]
+) -> Iterator[tuple[str, list[str]]]:
+    """Group consecutive *logfiles* by the section of *config* they match.
+
+    Yield pairs of section name and list of logfiles. Files matching no
+    section are given the name DEFAULT_SECTION.
+    """
+    match_section = section_matcher(
+        name for name in config if name != DEFAULT_SECTION
+    )
+    matches = (
+        (match_section(logfile) or DEFAULT_SECTION, logfile) for logfile in logfiles
+    )
+    for section_name, group in itertools.groupby(matches, key=lambda pair: pair[0]):
+        yield section_name, [logfile for _, logfile in group]
+
+
+def parse_kv_config(reader: Union[str, Iterable[str]]) -> dict[str, str]:
+    """Return a dict of keys to values parsed from *reader*, either a string
+    or lines of text.
 
     Simple syntax:
       - Keys separated from values by '='
@@ -309,16 +715,29 @@ def parse_kv_config(reader: Iterable[str]) -> dict[str, str]:
       - Each line either a key–value pair or a comment
       - External whitespace ignored
     """
-    symbols = {}
-    for line in reader:
-        line = line.lstrip()
-        if line.startswith("#"):
-            continue
-        key, sep, val = line.partition("=")
-        if not sep:
-            continue
-        symbols[key.strip().lower()] = val.strip()
-    return symbols
+    text = reader if isinstance(reader, str) else "".join(reader)
+    return {key.lower(): val for key, val in KV_PATTERN.findall(text)}
+
+
+def parse_sections(reader: Union[str, Iterable[str]]) -> dict[str, dict[str, str]]:
+    """Return a dict of section names to dicts of keys to values parsed from
+    *reader*, either a string or lines of text.
+
+    Each section starts with a line holding its name in square brackets;
+    any text after the closing bracket is ignored. Sections are parsed like
+    parse_kv_config(). Keys before the first section belong to
+    DEFAULT_SECTION. Raise ValueError on any other line starting with '['.
+    """
+    text = reader if isinstance(reader, str) else "".join(reader)
+    parts = SECTION_PATTERN.split(text)
+    for body in parts[::2]:
+        bad_line = BRACKET_LINE_PATTERN.search(body)
+        if bad_line is not None:
+            raise ValueError(f"invalid section header: {bad_line.group().strip()}")
+    sections = {DEFAULT_SECTION: parse_kv_config(parts[0])}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(name, {}).update(parse_kv_config(body))
+    return sections
 
 
 def datestr(date: Optional[str] = None, datefmt: Optional[str] = None) -> str:
@@ -327,17 +746,64 @@ def datestr(date: Optional[str] = None, datefmt: Optional[str] = None) -> str:
     ::
         $(date [--date ${date}] [${datefmt}])
     """
-    executable = shutil.which("date") or die("date: command not found")
+    executable = _which("date")
     cmds = [executable]
     if date is not None:
         cmds += ["--date", date]
     if datefmt is not None:
         cmds.append(datefmt)
+    return _run(cmds, capture=True).stdout.decode().strip()
+
+
+def datestr_batch(dates: Sequence[str], datefmt: Optional[str] = None) -> list[str]:
+    """Like datestr(), but convert all *dates* with a single call to `date`.
+
+    Return a list of results in the same order as *dates*.
+
+    ::
+        $(printf '%s\\n' ${dates} | date --file=- [${datefmt}])
+    """
+    if not dates:
+        return []
+    cmds = [_which("date"), "--file=-"]
+    if datefmt is not None:
+        cmds.append(datefmt)
+    stdin_data = "".join(f"{date}\n" for date in dates).encode()
+    proc = _run(cmds, stdin_data=stdin_data, capture=True)
+    results = proc.stdout.decode().splitlines()
+    if len(results) != len(dates):
+        die(f"date: expected {len(dates)} lines of output, got {len(results)}")
+    return results
+
+
+def _run(
+    cmds: Sequence[Arg],
+    check: bool = True,
+    stdin_data: Optional[bytes] = None,
+    capture: bool = False,
+) -> subprocess.CompletedProcess[bytes]:
+    # Run *cmds*, feeding it *stdin_data* and capturing its stdout if
+    # *capture*. If *check*, exit with an error message when it fails.
+    #
+    # close_fds=False is safe because file descriptors opened by Python are
+    # non-inheritable (PEP 446), so the child has nothing to close, and
+    # skipping the close loop makes each fork cheaper. Any descriptor made
+    # inheritable on purpose would leak into awk and date.
     try:
-        proc = subprocess.run(cmds, check=True, stdout=subprocess.PIPE)
+        return subprocess.run(
+            cmds,
+            check=check,
+            input=stdin_data,
+            stdout=subprocess.PIPE if capture else None,
+            close_fds=False,
+        )
     except subprocess.CalledProcessError as err:
         die(str(err))
-    return proc.stdout.decode().strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: Union[str, os.PathLike[str]]) -> str:
+    return shutil.which(name) or die(f"{name}: command not found")
 
 
 def die(message: str) -> NoReturn:
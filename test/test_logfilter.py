@@ -3,15 +3,141 @@
 #  Copyright 2023, 2024 Dylan Maltby
 #  SPDX-Licence-Identifier: Apache-2.0
 #
-# pylint: disable=missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-class-docstring,missing-function-docstring,protected-access
 
 """Unit tests for logfilter"""
 
+import glob
+import io
+import os
+import subprocess
+import tempfile
 import unittest
+import unittest.mock
 
 import logfilter
 
 
+class TestDisambiguate(unittest.TestCase):
+    def test_levels(self):
+        func = logfilter.disambiguate(logfilter.LOG_LEVELS, str.upper)
+        self.assertEqual(func("warn"), "WARNING")
+        self.assertEqual(func("DEBUG"), "DEBUG")
+        # Ambiguous between ERROR and EMERG
+        self.assertEqual(func("e"), "E")
+        self.assertEqual(func("verbose"), "VERBOSE")
+
+    def test_iterator(self):
+        func = logfilter.disambiguate(iter(["alpha", "beta"]))
+        self.assertEqual(func("a"), "alpha")
+        self.assertEqual(func("b"), "beta")
+
+    def test_empty(self):
+        self.assertEqual(logfilter.disambiguate(["alpha"])(""), "alpha")
+        self.assertEqual(logfilter.disambiguate(["alpha", "beta"])(""), "")
+
+
+class TestExpandPaths(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        for name in ["a.log", "b.log", "c.txt", ".hidden.log"]:
+            with open(os.path.join(self.tmpdir.name, name), "w", encoding="utf-8"):
+                pass
+        os.mkdir(os.path.join(self.tmpdir.name, "sub"))
+
+    def expand(self, *patterns):
+        paths = " ".join(os.path.join(self.tmpdir.name, p) for p in patterns)
+        return list(logfilter.expand_paths(paths))
+
+    def assert_like_glob(self, *patterns):
+        expected = []
+        for pattern in patterns:
+            expected += glob.glob(os.path.join(self.tmpdir.name, pattern))
+        self.assertCountEqual(self.expand(*patterns), expected)
+
+    def test_like_glob(self):
+        self.assert_like_glob("*.log")
+        self.assert_like_glob(".*")
+        self.assert_like_glob("*", "sub/")
+        self.assert_like_glob("a.log", "missing.log", "missing/*.log")
+        self.assert_like_glob("s*/*")
+
+    def test_quoting(self):
+        with open(os.path.join(self.tmpdir.name, "d e.log"), "wb"):
+            pass
+        for pattern in ['"d e.log"', "'d e'.log", "d\\ e.log"]:
+            paths = os.path.join(self.tmpdir.name, pattern)
+            self.assertEqual(
+                list(logfilter.expand_paths(paths)),
+                [os.path.join(self.tmpdir.name, "d e.log")],
+            )
+
+    def test_splitting(self):
+        for paths in ["", " a\tb\r\nc ", "a\xa0b c\x0bd", "a\u2000b\x0c"]:
+            with self.subTest(paths=paths):
+                with unittest.mock.patch("glob.iglob", lambda word: [word]):
+                    words = list(logfilter.expand_paths(paths))
+                self.assertEqual(words, logfilter.shlex.split(paths))
+
+    def test_no_duplicates(self):
+        results = self.expand("*.log", "a.*", "a.log")
+        self.assertCountEqual(
+            results,
+            [os.path.join(self.tmpdir.name, name) for name in ["a.log", "b.log"]],
+        )
+
+
+class TestFastParseArgs(unittest.TestCase):
+    defaults = logfilter.DEFAULTS
+    parsed = [
+        [],
+        ["a.log", "b.log"],
+        ["-a", "today", "-b", "now", "a.log"],
+        ["-atoday", "--before=now", "--after", "@0"],
+        ["--level", "warn", "--batch", "a.log"],
+        ["-lerr", "--no-batch", "--batch", "--no-batch"],
+        ["--level=DEBUG", "--", "-a.log", "--"],
+        ["a.log", "b.log", "--batch", "--level", "info"],
+        ["--after=", "-b", ""],
+    ]
+    unparsed = [
+        ["-h"],
+        ["--help", "a.log"],
+        ["--aft", "today"],
+        ["-a"],
+        ["-a", "-3days"],
+        ["-a=today"],
+        ["-l", "e"],
+        ["--level=verbose"],
+        ["-l", "bogus", "-l", "info"],
+        ["--level=", "-la"],
+        ["a.log", "--batch", "b.log"],
+        ["a.log", "--", "b.log"],
+        ["-"],
+    ]
+
+    def test_like_argparse(self):
+        parser = logfilter.build_cla_parser(self.defaults)
+        for argv in self.parsed:
+            with self.subTest(argv=argv):
+                self.assertEqual(
+                    logfilter.fast_parse_args(argv, self.defaults),
+                    parser.parse_args(argv),
+                )
+
+    def test_default_logfiles(self):
+        defaults = {**logfilter.DEFAULTS, "logfiles": "~/*"}
+        args = logfilter.build_cla_parser(defaults).parse_args([])
+        self.assertEqual(args.logfiles, [])
+        self.assertEqual(logfilter.fast_parse_args([], defaults).logfiles, [])
+
+    def test_fallback(self):
+        for argv in self.unparsed:
+            with self.subTest(argv=argv):
+                self.assertIsNone(logfilter.fast_parse_args(argv, self.defaults))
+
+
 class TestKVParse(unittest.TestCase):
     basic = r"""
     # Each line in this string is indented, but that shouldn't matter.
@@ -61,6 +187,177 @@ class TestKVParse(unittest.TestCase):
         results = self.func(self.ignore)
         self.assertEqual(results, {})
 
+    def test_string(self):
+        lines = self.basic + self.spacing + self.empty + self.ignore
+        self.assertEqual(self.func("".join(lines)), self.func(lines))
+        self.assertEqual(self.func("key=value"), {"key": "value"})
+
+
+class TestLoadConfigPaths(unittest.TestCase):
+    def test_search_path(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dirs = [os.path.join(tmpdir, name) for name in ("home", "etc", "usr")]
+            for config_dir in dirs:
+                os.makedirs(os.path.join(config_dir, "logfilter"))
+            with open(os.path.join(dirs[0], "logfilter", "config"), "wb"):
+                pass
+            os.symlink("missing", os.path.join(dirs[2], "logfilter", "config"))
+            environ = {
+                "XDG_CONFIG_HOME": dirs[0],
+                "XDG_CONFIG_DIRS": ":".join(dirs[1:]),
+            }
+            with unittest.mock.patch.dict(os.environ, environ):
+                paths = list(logfilter.load_config_paths("logfilter", "config"))
+            self.assertEqual(
+                paths,
+                [os.path.join(dirs[i], "logfilter", "config") for i in (0, 2)],
+            )
+
+
+class TestCachedLoad(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmpdir.cleanup)
+        self.config = os.path.join(tmpdir.name, "config")
+        with open(self.config, "w", encoding="utf-8") as file:
+            file.write("level = DEBUG\n")
+        environ = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=tmpdir.name)
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.calls = 0
+
+    def load(self, paths):
+        self.calls += 1
+        return [f"loaded {len(paths)}"]
+
+    def test_cached(self):
+        results = [
+            logfilter._cached_load("test.pickle", [self.config], self.load)
+            for _ in range(2)
+        ]
+        self.assertEqual(results, [["loaded 1"]] * 2)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(
+            os.path.exists(logfilter.load_cache_path("logfilter", "test.pickle"))
+        )
+
+    def test_damaged(self):
+        logfilter._cached_load("test.pickle", [self.config], self.load)
+        cache = logfilter.load_cache_path("logfilter", "test.pickle")
+        with open(cache, "rb") as file:
+            data = file.read()
+        # Truncated, garbage, and naming a global that doesn't exist
+        for damaged in [data[:-3], b"\x80\x04garbage", b"cbuiltins\nnope\n."]:
+            with open(cache, "wb") as file:
+                file.write(damaged)
+            with self.subTest(damaged=damaged):
+                result = logfilter._cached_load(
+                    "test.pickle", [self.config], self.load
+                )
+                self.assertEqual(result, ["loaded 1"])
+
+    def test_write_error(self):
+        cache_dir = os.path.dirname(logfilter.load_cache_path("logfilter", "x"))
+        with unittest.mock.patch("os.replace", side_effect=OSError):
+            result = logfilter._cached_load("test.pickle", [self.config], self.load)
+        self.assertEqual(result, ["loaded 1"])
+        self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_modified(self):
+        logfilter._cached_load("test.pickle", [self.config], self.load)
+        os.utime(self.config, ns=(0, 0))
+        logfilter._cached_load("test.pickle", [self.config], self.load)
+        self.assertEqual(self.calls, 2)
+
+    def test_paths_changed(self):
+        logfilter._cached_load("test.pickle", [self.config], self.load)
+        result = logfilter._cached_load("test.pickle", [], self.load)
+        self.assertEqual(result, ["loaded 0"])
+        self.assertEqual(self.calls, 2)
+
+
+class TestGroupBySection(unittest.TestCase):
+    config = {"DEFAULT": {}, "*app.log": {"level": "DEBUG"}}
+
+    def test_consecutive(self):
+        logfiles = ["a.log", "b.log", "app.log", "myapp.log", "c.log"]
+        groups = list(logfilter.group_by_section(logfiles, self.config))
+        self.assertEqual(
+            groups,
+            [
+                ("DEFAULT", ["a.log", "b.log"]),
+                ("*app.log", ["app.log", "myapp.log"]),
+                ("DEFAULT", ["c.log"]),
+            ],
+        )
+
+    def test_default_not_matched(self):
+        groups = list(logfilter.group_by_section(["DEFAULT"], {"DEFAULT": {}}))
+        self.assertEqual(groups, [("DEFAULT", ["DEFAULT"])])
+
+    def test_empty(self):
+        self.assertEqual(list(logfilter.group_by_section([], self.config)), [])
+
+
+class TestSectionMatcher(unittest.TestCase):
+    def test_first_match(self):
+        names = ["*.log", "app.log", "sys[0-9].txt"]
+        match_section = logfilter.section_matcher(names)
+        self.assertEqual(match_section("app.log"), "*.log")
+        self.assertEqual(match_section("sys1.txt"), "sys[0-9].txt")
+        self.assertIsNone(match_section("sysx.txt"))
+        self.assertIsNone(match_section("app.log.1"))
+
+    def test_no_sections(self):
+        self.assertIsNone(logfilter.section_matcher([])("app.log"))
+
+
+class TestParseSections(unittest.TestCase):
+    text = """
+    # Settings before any section are defaults
+    level = WARNING
+    [*app.log]
+    datefmt = +%Y-%m-%dT%H:%M:%S
+      [ spaced name ]
+    # [not a section]
+    program = $1 > after
+    [*app.log]
+    level = DEBUG
+    [DEFAULT]
+    batch = 1
+    """
+
+    def test_sections(self):
+        self.assertEqual(
+            logfilter.parse_sections(self.text),
+            {
+                "DEFAULT": {"level": "WARNING", "batch": "1"},
+                "*app.log": {"datefmt": "+%Y-%m-%dT%H:%M:%S", "level": "DEBUG"},
+                " spaced name ": {"program": "$1 > after"},
+            },
+        )
+
+    def test_lines(self):
+        lines = self.text.splitlines(keepends=True)
+        self.assertEqual(
+            logfilter.parse_sections(lines), logfilter.parse_sections(self.text)
+        )
+
+    def test_empty(self):
+        self.assertEqual(logfilter.parse_sections(""), {"DEFAULT": {}})
+
+    def test_trailing_text(self):
+        self.assertEqual(
+            logfilter.parse_sections("[*app.log] # note\nlevel = DEBUG\n"),
+            {"DEFAULT": {}, "*app.log": {"level": "DEBUG"}},
+        )
+
+    def test_invalid_header(self):
+        for text in ("[*app.log\nlevel = DEBUG\n", "level = DEBUG\n  []\n"):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(ValueError, "invalid section header"):
+                    logfilter.parse_sections(text)
+
 
 class TestDateStr(unittest.TestCase):
     default_datefmt = logfilter.DEFAULTS["datefmt"]
@@ -93,6 +390,21 @@ class TestDateStr(unittest.TestCase):
         now = logfilter.datestr("now", self.default_datefmt)
         self.assertLess(epoch, now)
 
+    def test_batch(self):
+        dates = ["today", "@0", "today", "20200721"]
+        self.assertEqual(
+            logfilter.datestr_batch(dates, self.default_datefmt),
+            [logfilter.datestr(date, self.default_datefmt) for date in dates],
+        )
+        self.assertEqual(logfilter.datestr_batch([], self.default_datefmt), [])
+        self.assertEqual(
+            logfilter.datestr_batch(["today", ""], self.default_datefmt),
+            [logfilter.datestr(date, self.default_datefmt) for date in ["today", ""]],
+        )
+        self.assertRaises(
+            SystemExit, logfilter.datestr_batch, ["today", "my birthday"]
+        )
+
     def test_errors(self):
         # You forgot to prefix datefmt with '+'
         self.assertRaises(SystemExit, logfilter.datestr, datefmt="%Y-%m-%d")
@@ -100,6 +412,58 @@ class TestDateStr(unittest.TestCase):
         self.assertRaises(SystemExit, logfilter.datestr, date="my birthday")
 
 
+class TestAWKRules(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmpdir.cleanup)
+        self.files = []
+        self.expected = ""
+        for name, text in [("a", "line\n"), ("empty", ""), ("b", "")]:
+            self.files.append(os.path.join(tmpdir.name, name))
+            with open(self.files[-1], "w", encoding="utf-8") as file:
+                file.write(text)
+            self.expected += f"\n==> {self.files[-1]} <==\n{text}"
+        self.file_list = os.path.join(tmpdir.name, "files.txt")
+        with open(self.file_list, "w", encoding="utf-8") as file:
+            file.writelines(f"{name}\n" for name in self.files)
+
+    @staticmethod
+    def run_awk(*args):
+        proc = subprocess.run(
+            ["awk", *args], check=True, stdout=subprocess.PIPE, text=True
+        )
+        return proc.stdout
+
+    def test_header_rule(self):
+        stdout = self.run_awk("--", logfilter.HEADER_RULE + "1", *self.files)
+        self.assertEqual(stdout, self.expected)
+
+    def test_file_list_rule(self):
+        program = logfilter.FILE_LIST_RULE + logfilter.HEADER_RULE + "1"
+        stdout = self.run_awk("-v", f"lf_filelist={self.file_list}", "--", program)
+        self.assertEqual(stdout, self.expected)
+
+
+class TestRunJobs(unittest.TestCase):
+    def test_order(self):
+        output = io.BytesIO()
+        stdout = io.TextIOWrapper(output)
+        jobs = [["sh", "-c", "sleep 0.2; echo a"], ["echo", "b"]]
+        with unittest.mock.patch("sys.stdout", stdout):
+            logfilter.run_jobs(jobs)
+        self.assertEqual(output.getvalue(), b"a\nb\n")
+
+    def test_error(self):
+        output = io.BytesIO()
+        stdout = io.TextIOWrapper(output)
+        jobs = [["echo", "a"], ["false"]]
+        with unittest.mock.patch("sys.stdout", stdout), unittest.mock.patch(
+            "sys.stderr", io.StringIO()
+        ):
+            self.assertRaises(SystemExit, logfilter.run_jobs, jobs)
+        self.assertEqual(output.getvalue(), b"a\n")
+
+
 class TestAWK(unittest.TestCase):
     def test_availability(self):
         """Check if `awk` is installed on $PATH."""
@@ -107,6 +471,13 @@ class TestAWK(unittest.TestCase):
             logfilter.shutil.which("awk"), "'awk' is not installed on $PATH"
         )
 
+    def test_exit_status(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            empty = os.path.join(tmpdir, "empty")
+            with open(empty, "wb"):
+                pass
+            self.assertEqual(logfilter.awk([empty], program_text="0"), 0)
+
 
 if __name__ == "__main__":
     unittest.main()